@@ -2,26 +2,68 @@ import os
 import json
 import logging
 import base64
-import io
+import hashlib
 import time
 import random
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import streamlit as st
 from PIL import Image
 import google.generativeai as genai
 from google.generativeai import GenerativeModel
+from typing_extensions import TypedDict
+from classification_store import ClassificationStore
+from utils import fast_thumbnail, image_to_jpeg_bytes
+
+
+class FigureDetails(TypedDict):
+    visual_elements: list[str]
+    data_type: str
+    domain: str
+
+
+class FigureClassification(TypedDict):
+    """Response schema Gemini is constrained to when classifying a figure."""
+    type: str
+    confidence: float
+    description: str
+    details: FigureDetails
+    reasoning: str
 
 
 class AIFigureClassifier:
     """AI-powered figure classifier using Google Gemini."""
 
-    def __init__(self):
+    # Gemini results keyed by image content hash. Shared across instances so
+    # a fresh classifier on each Streamlit rerun still hits the cache; a small
+    # LRU in front of the capped on-disk store.
+    _result_cache = OrderedDict()
+    _result_cache_entries = 2048
+    _cache_lock = threading.Lock()
+
+    # Upper bound on in-flight Gemini requests across all callers, to stay under QPS limits
+    _request_slots = threading.BoundedSemaphore(8)
+
+    def __init__(self, max_edge=1024):
         self.logger = logging.getLogger(__name__)
-        self.confidence_score = 0.0
+        # Gemini downsamples large inputs itself, so anything bigger only costs encode time and upload bandwidth
+        self.max_edge = max_edge
 
         # Configure Gemini
         genai.configure(api_key=st.secrets["google_ai"]["api_key"])
-        self.model = GenerativeModel("gemini-pro-vision")
+        # gemini-pro-vision can't do schema-constrained JSON output, the Flash models can
+        self.model_name = "gemini-2.0-flash"
+        self.model = GenerativeModel(self.model_name)
+        self.generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": FigureClassification
+        }
+        self.batch_generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": list[FigureClassification]
+        }
 
         self.figure_categories = {
             "bar_chart": "Bar Chart - Shows data using rectangular bars",
@@ -50,45 +92,116 @@ class AIFigureClassifier:
             "unknown": "Unknown - Cannot determine figure type"
         }
 
-    def classify_figure(self, image):
+        # The prompt only depends on the categories, so build it once
+        self._prompt = self._create_classification_prompt()
+
+        # Cached results are only valid for the model and prompt that produced them
+        prompt_version = hashlib.blake2b(self._prompt.encode(), digest_size=8).hexdigest()
+        self._cache_namespace = f"{self.model_name}:{prompt_version}"
+        self._store = ClassificationStore()
+
+    @property
+    def cache_namespace(self):
+        """Model and prompt version; any cache of this classifier's results must include it in its key."""
+        return self._cache_namespace
+
+    def classify_figure(self, image, image_bytes=None, mime_type='image/png'):
+        """
+        Classify a single figure.
+
+        Args:
+            image (PIL.Image): The figure to classify
+            image_bytes (bytes): Optional already-encoded image data, uploaded
+                as-is instead of re-encoding the PIL image
+            mime_type (str): MIME type of image_bytes
+
+        Returns:
+            dict: Classification results with type, confidence, and description
+        """
+        return self._classify_keyed(image, self._image_key(image), image_bytes, mime_type)
+
+    def _image_key(self, image):
+        """Content hash of the decoded pixels, used as the cache key."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.width}x{image.height}".encode())
+        digest.update(image.tobytes())
+        return f"{self._cache_namespace}:{digest.hexdigest()}"
+
+    def _get_cached(self, key):
+        with self._cache_lock:
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                self._result_cache.move_to_end(key)
+        if cached is None:
+            # Fall back to the on-disk store, which survives server restarts
+            cached = self._store.get(key)
+            if cached is not None:
+                self._cache_in_memory(key, cached)
+        return cached
+
+    def _remember(self, key, result):
+        self._cache_in_memory(key, result)
+        self._store.put(key, result)
+
+    def _cache_in_memory(self, key, result):
+        with self._cache_lock:
+            self._result_cache[key] = result
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self._result_cache_entries:
+                self._result_cache.popitem(last=False)
+
+    def _classify_keyed(self, image, key, image_bytes=None, mime_type='image/png'):
+        cached = self._get_cached(key)
+        if cached is not None:
+            return dict(cached)
+
+        result = self._classify_with_gemini(image, image_bytes, mime_type)
+        if result is None:
+            # Fallbacks are not cached so the figure is retried once quota recovers
+            return self._fallback_classification(image)
+
+        self._remember(key, result)
+        return dict(result)
+
+    def _classify_with_gemini(self, image, image_bytes=None, mime_type='image/png'):
+        try:
+            contents = [self._image_part(image, image_bytes, mime_type), self._prompt]
+        except Exception as e:
+            self.logger.error(f"Error preparing image for AI classification: {str(e)}")
+            return None
+
+        response_text = self._generate(contents, self.generation_config)
+        if not response_text:
+            return None
+
+        try:
+            return self._parse_result(json.loads(response_text))
+        except (json.JSONDecodeError, AttributeError):
+            self.logger.warning("Non-JSON Gemini response, using fallback.")
+            return None
+
+    def _image_part(self, image, image_bytes=None, mime_type='image/png'):
+        # Oversized images are downscaled, so their original bytes can't be passed through
+        if max(image.size) > self.max_edge:
+            image = fast_thumbnail(image, self.max_edge)
+            image_bytes = None
+        if image_bytes is None:
+            image_bytes, mime_type = self._encode_image(image)
+        return {"mime_type": mime_type, "data": image_bytes}
+
+    def _generate(self, contents, generation_config):
+        """Call Gemini with retries on rate limiting; returns the response text or None."""
         max_retries = 3
         base_delay = 1.0
 
         for attempt in range(max_retries):
             try:
-                # Convert image to bytes
-                img_buffer = io.BytesIO()
-                image.save(img_buffer, format='PNG')
-                img_buffer.seek(0)
-                image_bytes = img_buffer.read()
-
-                prompt = self._create_classification_prompt()
-
-                response = self.model.generate_content(
-                    contents=[
-                        {"mime_type": "image/png", "data": image_bytes},
-                        prompt
-                    ],
-                    generation_config={"response_mime_type": "text/plain"}
-                )
-
-
-                if response.text:
-                    try:
-                        result = json.loads(response.text)
-                        self.confidence_score = result.get('confidence', 0.5)
-                        return {
-                            'classification': result.get('type', 'unknown'),
-                            'confidence': self.confidence_score,
-                            'description': result.get('description', 'No description available'),
-                            'details': result.get('details', {}),
-                            'reasoning': result.get('reasoning', '')
-                        }
-                    except json.JSONDecodeError:
-                        self.logger.warning("Non-JSON Gemini response, using fallback.")
-                        return self._fallback_classification(image)
-                else:
-                    return self._fallback_classification(image)
+                with self._request_slots:
+                    response = self.model.generate_content(
+                        contents=contents,
+                        generation_config=generation_config
+                    )
+                return response.text
 
             except Exception as e:
                 error_msg = str(e)
@@ -102,11 +215,24 @@ class AIFigureClassifier:
                         continue
                     else:
                         self.logger.error("Rate limit exceeded, using fallback classification")
-                        return self._fallback_classification(image)
+                        return None
                 else:
-                    return self._fallback_classification(image)
+                    return None
 
-        return self._fallback_classification(image)
+        return None
+
+    def _parse_result(self, result):
+        return {
+            'classification': result.get('type', 'unknown'),
+            'confidence': result.get('confidence', 0.5),
+            'description': result.get('description', 'No description available'),
+            'details': result.get('details', {}),
+            'reasoning': result.get('reasoning', '')
+        }
+
+    def _encode_image(self, image):
+        """Encode an image as JPEG, which is far smaller and cheaper than PNG for upload."""
+        return image_to_jpeg_bytes(image, quality=85), 'image/jpeg'
 
     def _create_classification_prompt(self):
         categories_text = "\n".join([f"- {key}: {desc}" for key, desc in self.figure_categories.items()])
@@ -140,6 +266,7 @@ Be extremely accurate. If you're not sure between two categories, pick the most
 """
 
     def _fallback_classification(self, image=None):
+        # Results flagged as fallback are never cached, so they are retried once Gemini recovers
         try:
             if image is not None:
                 img_array = np.array(image)
@@ -171,7 +298,6 @@ Be extremely accurate. If you're not sure between two categories, pick the most
                     confidence = 0.3
                     description = 'Grayscale content, likely diagram or text'
 
-                self.confidence_score = confidence
                 return {
                     'classification': classification,
                     'confidence': confidence,
@@ -181,10 +307,10 @@ Be extremely accurate. If you're not sure between two categories, pick the most
                         'analysis_method': 'Local fallback analysis',
                         'aspect_ratio': f'{aspect_ratio:.2f}'
                     },
-                    'reasoning': f'AI quota exceeded, used local analysis. Aspect ratio: {aspect_ratio:.2f}'
+                    'reasoning': f'AI quota exceeded, used local analysis. Aspect ratio: {aspect_ratio:.2f}',
+                    'fallback': True
                 }
             else:
-                self.confidence_score = 0.3
                 return {
                     'classification': 'unknown',
                     'confidence': 0.3,
@@ -193,10 +319,10 @@ Be extremely accurate. If you're not sure between two categories, pick the most
                         'visual_elements': ['visual content'],
                         'analysis_method': 'Basic fallback'
                     },
-                    'reasoning': 'AI classification unavailable due to quota limits'
+                    'reasoning': 'AI classification unavailable due to quota limits',
+                    'fallback': True
                 }
         except Exception as e:
-            self.confidence_score = 0.2
             return {
                 'classification': 'unknown',
                 'confidence': 0.2,
@@ -205,21 +331,134 @@ Be extremely accurate. If you're not sure between two categories, pick the most
                     'visual_elements': ['visual content'],
                     'analysis_method': 'Error fallback'
                 },
-                'reasoning': f'Fallback analysis failed: {str(e)}'
+                'reasoning': f'Fallback analysis failed: {str(e)}',
+                'fallback': True
             }
 
-    def get_confidence(self):
-        return self.confidence_score
-
     def get_supported_categories(self):
         return self.figure_categories
 
-    def batch_classify(self, images, progress_callback=None):
-        results = []
+    def batch_classify(self, images, progress_callback=None, max_workers=8, encoded_images=None):
         total = len(images)
-        for i, image in enumerate(images):
-            result = self.classify_figure(image)
-            results.append(result)
-            if progress_callback:
-                progress_callback(i + 1, total)
-        return results
+        keys = [self._image_key(image) for image in images]
+        key_counts = Counter(keys)
+        if encoded_images is None:
+            encoded_images = [(None, 'image/png')] * total
+
+        # Identical images in one batch only pay for a single classification
+        unique_images = {}
+        for key, image, encoded in zip(keys, images, encoded_images):
+            unique_images.setdefault(key, (image, encoded))
+
+        results_by_key = {}
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._classify_keyed, image, key, *encoded): key
+                for key, (image, encoded) in unique_images.items()
+            }
+            # Progress is reported from the calling thread so Streamlit widgets stay usable
+            for future in as_completed(futures):
+                key = futures[future]
+                results_by_key[key] = future.result()
+                done += key_counts[key]
+                if progress_callback:
+                    progress_callback(done, total)
+
+        return [dict(results_by_key[key]) for key in keys]
+
+    def classify_batch(self, images, batch_size=8, progress_callback=None, max_workers=4, encoded_images=None):
+        """
+        Classify figures by sending up to batch_size images per Gemini request.
+
+        Args:
+            images (list): PIL images to classify
+            batch_size (int): Maximum number of images in one request
+            progress_callback (callable): Called as progress_callback(done, total)
+            max_workers (int): Number of requests kept in flight at once
+            encoded_images (list): Optional (bytes, mime_type) pairs aligned with images
+
+        Returns:
+            list: Classification result dicts, in the same order as images
+        """
+        total = len(images)
+        keys = [self._image_key(image) for image in images]
+        key_counts = Counter(keys)
+        if encoded_images is None:
+            encoded_images = [(None, 'image/png')] * total
+
+        results_by_key = {}
+        misses = {}
+        for key, image, encoded in zip(keys, images, encoded_images):
+            if key in results_by_key or key in misses:
+                continue
+            cached = self._get_cached(key)
+            if cached is not None:
+                results_by_key[key] = cached
+            else:
+                misses[key] = (image, encoded)
+
+        done = sum(key_counts[key] for key in results_by_key)
+        if progress_callback and done:
+            progress_callback(done, total)
+
+        pending = list(misses.items())
+        groups = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        # Each request worker builds its own group's image parts; callers pass already
+        # encoded bytes (encoded_images) so that is usually just a pass-through
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(groups)) or 1) as executor:
+            futures = {executor.submit(self._classify_group, group): group for group in groups}
+            for future in as_completed(futures):
+                for key, result in future.result().items():
+                    results_by_key[key] = result
+                    done += key_counts[key]
+                if progress_callback:
+                    progress_callback(done, total)
+
+        return [dict(results_by_key[key]) for key in keys]
+
+    def _classify_group(self, group):
+        """Classify (key, (image, encoded)) pairs in one request; returns {key: result}."""
+        results = self._classify_group_with_gemini(group)
+        if results is None:
+            # Retry individually, which also applies the per-image fallback
+            return {key: self._classify_keyed(image, key, *encoded) for key, (image, encoded) in group}
+
+        for (key, _), result in zip(group, results):
+            self._remember(key, result)
+        return {key: dict(result) for (key, _), result in zip(group, results)}
+
+    def _classify_group_with_gemini(self, group):
+        try:
+            contents = []
+            for i, (_, (image, encoded)) in enumerate(group):
+                contents.append(f"Image {i + 1}:")
+                contents.append(self._image_part(image, *encoded))
+        except Exception as e:
+            self.logger.error(f"Error preparing images for AI classification: {str(e)}")
+            return None
+
+        contents.append(
+            self._prompt +
+            f"\nMULTIPLE IMAGES: {len(group)} images are attached above. Return a JSON array of "
+            f"{len(group)} objects in the format above, one per image, in the same order as the images.\n"
+        )
+
+        response_text = self._generate(contents, self.batch_generation_config)
+        if not response_text:
+            return None
+
+        try:
+            parsed = json.loads(response_text)
+        except json.JSONDecodeError:
+            self.logger.warning("Non-JSON Gemini batch response, classifying images individually.")
+            return None
+
+        if not isinstance(parsed, list) or len(parsed) != len(group):
+            self.logger.warning("Gemini batch response does not match the number of images, classifying individually.")
+            return None
+
+        try:
+            return [self._parse_result(item) for item in parsed]
+        except AttributeError:
+            return None
@@ -1,8 +1,15 @@
 import streamlit as st
 import os
 import tempfile
+import shutil
 import zipfile
 import io
+import math
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from PIL import Image
 import pandas as pd
@@ -10,7 +17,30 @@ from figure_extractor import PDFFigureExtractor
 from ai_classifier import AIFigureClassifier
 from pdf_downloader import PDFDownloader
 from report_generator import PDFReportGenerator
-from utils import create_download_link, get_file_size, format_figure_type, get_figure_type_emoji
+from artifact_store import ArtifactStore
+from utils import (create_download_link, get_file_size, format_figure_type, get_figure_type_emoji,
+                   image_to_png_bytes, image_to_jpeg_bytes, fast_thumbnail, file_sha256)
+
+# Figures sent to Gemini per classification request
+CLASSIFY_BATCH_SIZE = 8
+# Batches classified concurrently while extraction continues
+CLASSIFY_WORKERS = 4
+# How long to wait for a partial batch to fill before classifying it anyway
+BATCH_WAIT_SECONDS = 0.2
+# Figure cards rendered per results page
+FIGURES_PER_PAGE = 20
+# Processed PDFs kept in memory; entries hold decoded images, so keep this small
+RESULTS_CACHE_ENTRIES = 8
+# Default minimum figure area (px²); smaller images are icons and glyphs, not figures
+MIN_FIGURE_AREA = 4096
+# Figures outside this width/height range are rules and bars, not worth a classifier call
+MIN_ASPECT_RATIO = 0.1
+MAX_ASPECT_RATIO = 10
+# Content types that don't say what a download is; a PDF may still be behind them
+GENERIC_CONTENT_TYPES = {
+    'application/octet-stream', 'binary/octet-stream', 'application/download',
+    'application/x-download', 'application/force-download',
+}
 
 # Initialize session state
 if 'extracted_figures' not in st.session_state:
@@ -21,6 +51,14 @@ if 'processing_complete' not in st.session_state:
     st.session_state.processing_complete = False
 if 'source_info' not in st.session_state:
     st.session_state.source_info = "PDF Document"
+if 'zip_file' not in st.session_state:
+    st.session_state.zip_file = None
+if 'classification_df' not in st.session_state:
+    st.session_state.classification_df = None
+if 'sort_orders' not in st.session_state:
+    st.session_state.sort_orders = {}
+if 'view_orders' not in st.session_state:
+    st.session_state.view_orders = {}
 
 def main():
     st.set_page_config(
@@ -36,6 +74,9 @@ def main():
     # Sidebar for file upload
     with st.sidebar:
         st.header("PDF Input Options")
+        min_area = st.slider(
+            "Minimum figure area (px²)", min_value=0, max_value=65536, value=MIN_FIGURE_AREA, step=1024,
+            help="Smaller images are skipped before classification")
         tab1, tab2 = st.tabs(["📁 Upload File", "🔗 From URL"])
 
         with tab1:
@@ -46,7 +87,7 @@ def main():
                 st.info(f"File size: {file_size}")
 
                 if st.button("Process Uploaded PDF", type="primary"):
-                    process_pdf(uploaded_file)
+                    process_pdf(uploaded_file, min_area)
 
         with tab2:
             pdf_url = st.text_input("Enter PDF URL", placeholder="https://example.com/document.pdf")
@@ -56,83 +97,297 @@ def main():
                     validate_pdf_url(pdf_url)
 
                 if st.button("Process PDF from URL", type="primary"):
-                    process_pdf_from_url(pdf_url)
+                    process_pdf_from_url(pdf_url, min_area)
 
-    # Main content
+    # Main content, drawn after the sidebar so results processed on this run show up immediately
     if st.session_state.processing_complete and st.session_state.extracted_figures:
         display_results()
     else:
         display_welcome_screen()
 
-def process_pdf(uploaded_file, from_url=False, url=None):
+def process_pdf(uploaded_file, min_area=MIN_FIGURE_AREA):
     try:
+        # Stream the upload in chunks rather than materializing a second copy with getvalue()
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, tmp_file, length=1 << 20)
             tmp_file_path = tmp_file.name
+    except Exception as e:
+        st.error(f"Error processing PDF: {str(e)}")
+        return
 
-        extractor = PDFFigureExtractor()
-        classifier = AIFigureClassifier()
+    try:
+        process_pdf_path(tmp_file_path, f"Uploaded PDF: {uploaded_file.name}", min_area)
+    finally:
+        os.unlink(tmp_file_path)
 
+def process_pdf_path(pdf_path, source_info, min_area=MIN_FIGURE_AREA):
+    """Run extraction and classification on a PDF already on disk and store the results."""
+    try:
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        status_text.text("Extracting figures from PDF...")
-        progress_bar.progress(25)
-
-        extracted_figures = extractor.extract_figures(tmp_file_path)
+        # Identical PDFs (re-clicks, reruns, other sessions) reuse earlier results
+        # The size filter changes which figures are kept, so it is part of the key
+        # Results from another model or prompt version must not be reused either
+        results_key = (file_sha256(pdf_path), min_area, get_classifier().cache_namespace)
+        results = get_cached_results(results_key)
+        if results is None:
+            # Results saved on disk survive server restarts
+            results = get_artifact_store().load(*results_key)
+            if results is None:
+                results = run_pipeline(pdf_path, progress_bar, status_text, min_area)
+                # Fallback labels are not persisted, so the PDF is classified again once Gemini recovers
+                if results[0] and not has_fallback_results(results[1]):
+                    get_artifact_store().save(*results_key, *results)
+            if results[0] and not has_fallback_results(results[1]):
+                cache_results(results_key, results)
+        extracted_figures, classification_results, skipped = results
+
+        if skipped:
+            st.info(f"Skipped {skipped} tiny or degenerate images before classification.")
 
         if not extracted_figures:
+            progress_bar.empty()
+            status_text.empty()
             st.warning("No figures found in the PDF document.")
-            os.unlink(tmp_file_path)
             return
 
-        progress_bar.progress(50)
-        status_text.text(f"Found {len(extracted_figures)} figures. Classifying...")
-
-        classification_results = []
-        for i, figure_data in enumerate(extracted_figures):
-            status_text.text(f"Classifying figure {i+1}/{len(extracted_figures)}...")
-            result = classifier.classify_figure(figure_data['image'])
-            classification_results.append({
-                'figure_id': i,
-                'classification': result['classification'],
-                'confidence': result['confidence'],
-                'description': result['description'],
-                'details': result.get('details', {}),
-                'reasoning': result.get('reasoning', ''),
-                'page': figure_data['page'],
-                'bbox': figure_data['bbox']
-            })
-            progress = 50 + (i + 1) * 40 / len(extracted_figures)
-            progress_bar.progress(int(progress))
-
         progress_bar.progress(100)
         status_text.text("Processing complete!")
 
         st.session_state.extracted_figures = extracted_figures
         st.session_state.classification_results = classification_results
+        # Row labels line up with positions in classification_results
+        classification_df = pd.DataFrame(classification_results, columns=['figure_id', 'classification', 'confidence', 'page'])
+        st.session_state.classification_df = classification_df
+        st.session_state.sort_orders = compute_sort_orders(classification_df)
+        st.session_state.view_orders = {}
         st.session_state.processing_complete = True
-        st.session_state.source_info = f"PDF from URL: {url}" if from_url else f"Uploaded PDF: {uploaded_file.name}"
+        if st.session_state.zip_file is not None:
+            st.session_state.zip_file.close()
+        st.session_state.zip_file = None
+        st.session_state.source_info = source_info
 
-        os.unlink(tmp_file_path)
         progress_bar.empty()
         status_text.empty()
 
+        # No st.rerun() needed: main() renders the results right after this returns
         st.success(f"Successfully extracted and classified {len(extracted_figures)} figures!")
-        st.rerun()
 
     except Exception as e:
         st.error(f"Error processing PDF: {str(e)}")
-        if 'tmp_file_path' in locals():
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass
+
+def run_pipeline(pdf_path, progress_bar, status_text, min_area=MIN_FIGURE_AREA):
+    """Extract and classify all figures in a PDF; returns (extracted_figures, classification_results, skipped)."""
+    extractor = get_extractor()
+    classifier = get_classifier()
+
+    status_text.text("Extracting figures from PDF...")
+    progress_bar.progress(25)
+
+    extracted_figures, results, skipped = extract_and_classify(
+        pdf_path, extractor, classifier, progress_bar, status_text, min_area)
+
+    classification_results = []
+    for i, (figure_data, result) in enumerate(zip(extracted_figures, results)):
+        classification_results.append({
+            'figure_id': i,
+            'classification': result['classification'],
+            'confidence': result['confidence'],
+            'description': result['description'],
+            'details': result.get('details', {}),
+            'reasoning': result.get('reasoning', ''),
+            'page': figure_data['page'],
+            'bbox': figure_data['bbox'],
+            'fallback': result.get('fallback', False)
+        })
+
+    return extracted_figures, classification_results, skipped
+
+@st.cache_resource
+def get_extractor():
+    return PDFFigureExtractor()
+
+@st.cache_resource
+def get_classifier():
+    """One classifier per server process; it is stateless, so sessions can share it."""
+    return AIFigureClassifier()
+
+@st.cache_resource
+def get_artifact_store():
+    return ArtifactStore()
+
+@st.cache_resource
+def _results_cache():
+    """Process-wide LRU of pipeline results keyed by (PDF SHA-256, min area, classifier namespace), shared by all sessions."""
+    return OrderedDict(), threading.Lock()
+
+def has_fallback_results(classification_results):
+    return any(result.get('fallback') for result in classification_results)
+
+def get_cached_results(results_key):
+    cache, lock = _results_cache()
+    with lock:
+        if results_key not in cache:
+            return None
+        cache.move_to_end(results_key)
+        return cache[results_key]
+
+def cache_results(results_key, results):
+    cache, lock = _results_cache()
+    with lock:
+        cache[results_key] = results
+        cache.move_to_end(results_key)
+        while len(cache) > RESULTS_CACHE_ENTRIES:
+            cache.popitem(last=False)
+
+def extract_and_classify(pdf_path, extractor, classifier, progress_bar, status_text, min_area=MIN_FIGURE_AREA):
+    """
+    Extract and classify figures as a pipeline: a producer thread pushes figures
+    onto a queue as pages are processed, while this thread drains them in batches
+    and hands each batch to a classification worker. Figures that fail
+    is_classifiable are dropped before they reach the classifier.
+
+    Returns:
+        tuple: (extracted_figures, classification results in the same order, skipped count)
+    """
+    # Unbounded so the producer can never block forever if classification fails part way
+    figure_queue = queue.Queue()
+    producer_errors = []
+
+    def produce():
+        try:
+            for figure_data in extractor.iter_figures(pdf_path):
+                figure_queue.put(figure_data)
+        except Exception as e:
+            producer_errors.append(e)
+        finally:
+            figure_queue.put(None)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    extracted_figures = []
+    pending = []
+    skipped = 0
+    extraction_done = False
+    last_reported = None
+
+    def report(classified):
+        # Each widget update is a websocket message, so only send when the text or percentage changes
+        nonlocal last_reported
+        found = len(extracted_figures)
+        state = (found, classified, int(25 + 65 * classified / found) if found else 25)
+        if state == last_reported:
+            return
+        last_reported = state
+        status_text.text(f"Found {found} figures, classified {classified}...")
+        progress_bar.progress(state[2])
+
+    # The queue consumer stays on the script thread (Streamlit widgets can't be
+    # updated from other threads); classification itself runs on the pool.
+    with ThreadPoolExecutor(max_workers=CLASSIFY_WORKERS) as executor:
+        while not extraction_done:
+            batch = []
+            deadline = time.monotonic() + BATCH_WAIT_SECONDS
+            while len(batch) < CLASSIFY_BATCH_SIZE:
+                try:
+                    figure_data = figure_queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if figure_data is None:
+                    extraction_done = True
+                    break
+                if not is_classifiable(figure_data['image'], min_area):
+                    skipped += 1
+                    continue
+                batch.append(figure_data)
+
+            if batch:
+                prepare_figure_bytes(batch)
+                extracted_figures.extend(batch)
+                pending.append(executor.submit(
+                    classifier.classify_batch,
+                    [figure_data['image'] for figure_data in batch],
+                    batch_size=CLASSIFY_BATCH_SIZE,
+                    encoded_images=[upload_encoding(figure_data) for figure_data in batch]))
+
+            report(sum(len(future.result()) for future in pending if future.done()))
+
+        results = []
+        for future in pending:
+            results.extend(future.result())
+            report(len(results))
+
+    producer.join()
+    if producer_errors:
+        raise producer_errors[0]
+
+    return extracted_figures, results, skipped
+
+def upload_encoding(figure_data):
+    """(bytes, mime_type) to send to the classifier; (None, 'image/jpeg') asks it to JPEG-encode the image."""
+    if figure_data.get('source_mime_type') == 'image/jpeg':
+        # Embedded JPEGs go up exactly as stored in the PDF
+        return figure_data['source_bytes'], 'image/jpeg'
+    if figure_data.get('type') == 'vector':
+        # Line art renders compress well as PNG and JPEG would blur their edges
+        return figure_data.get('image_bytes'), figure_data.get('mime_type', 'image/png')
+    # The extractor's raster bytes are a PyMuPDF PNG re-encode, much larger than a JPEG
+    return None, 'image/jpeg'
+
+def is_classifiable(image, min_area=MIN_FIGURE_AREA):
+    """Whether an image is big enough, and not too thin, to be worth classifying."""
+    width, height = image.size
+    if width * height < min_area or height == 0:
+        return False
+    return MIN_ASPECT_RATIO < width / height < MAX_ASPECT_RATIO
+
+def prepare_figure_bytes(figures):
+    """Encode each figure's PNG and card thumbnail once; reruns, downloads and the ZIP reuse these bytes."""
+    if len(figures) <= 1:
+        for figure_data in figures:
+            _encode_figure(figure_data)
+        return
+
+    # PIL releases the GIL while resizing and encoding, so threads give real parallelism
+    with ThreadPoolExecutor(max_workers=min(len(figures), os.cpu_count() or 1)) as executor:
+        list(executor.map(_encode_figure, figures))
+
+def _encode_figure(figure_data):
+    if figure_data.get('image_bytes') and figure_data.get('mime_type') == 'image/png':
+        figure_data['png_bytes'] = figure_data['image_bytes']
+    else:
+        figure_data['png_bytes'] = image_to_png_bytes(figure_data['image'])
+    figure_data['thumb_bytes'] = image_to_jpeg_bytes(fast_thumbnail(figure_data['image'], 400), quality=80)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _url_info(url):
+    """HEAD metadata for a URL, cached so repeat clicks on the same URL skip the round trip."""
+    file_info = PDFDownloader().get_file_info_from_url(url)
+    if file_info is None:
+        # Raising keeps failures out of the cache so the next click retries
+        raise ValueError("Could not access the URL.")
+    return file_info
+
+def get_url_info(url):
+    try:
+        return _url_info(url)
+    except ValueError:
+        return None
+
+def is_known_non_pdf(file_info):
+    """Whether the HEAD content type positively names something other than a PDF."""
+    content_type = file_info['content_type'].split(';')[0].strip().lower()
+    if file_info['is_pdf'] or not content_type:
+        return False
+    # Servers often send PDFs as generic binary downloads, so these prove nothing
+    return content_type not in GENERIC_CONTENT_TYPES
 
 def validate_pdf_url(url):
     try:
-        downloader = PDFDownloader()
-        file_info = downloader.get_file_info_from_url(url)
+        file_info = get_url_info(url)
 
         if file_info is None:
             st.error("Could not access the URL.")
@@ -152,24 +407,23 @@ def validate_pdf_url(url):
     except Exception as e:
         st.error(f"Error validating URL: {str(e)}")
 
-def process_pdf_from_url(url):
+def process_pdf_from_url(url, min_area=MIN_FIGURE_AREA):
     try:
+        # Reuses the metadata from Validate, so a known non-PDF never starts a download;
+        # anything less certain is left to the downloader's %PDF sniff
+        file_info = get_url_info(url)
+        if file_info is not None and is_known_non_pdf(file_info):
+            st.error("The URL does not point to a PDF file.")
+            return
+
         downloader = PDFDownloader()
         tmp_file_path = downloader.download_pdf_from_url(url)
 
-        with open(tmp_file_path, 'rb') as f:
-            content = f.read()
-
-        class MockUploadedFile:
-            def __init__(self, content, name):
-                self.content = content
-                self.name = name
-            def getvalue(self):
-                return self.content
-
-        mock_file = MockUploadedFile(content, url.split('/')[-1])
-        process_pdf(mock_file, from_url=True, url=url)
-        os.unlink(tmp_file_path)
+        # The downloaded file is processed in place; no second copy in memory or on disk
+        try:
+            process_pdf_path(tmp_file_path, f"PDF from URL: {url}", min_area)
+        finally:
+            os.unlink(tmp_file_path)
 
     except Exception as e:
         st.error(f"Error processing PDF from URL: {str(e)}")
@@ -190,52 +444,67 @@ def display_welcome_screen():
 def display_results():
     figures = st.session_state.extracted_figures
     classifications = st.session_state.classification_results
+    df = st.session_state.classification_df
+
+    summary = _summarize_classifications(df)
 
     st.header("📈 Analysis Summary")
     col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Total Figures", len(figures))
     with col2:
-        unique_types = len(set(c['classification'] for c in classifications))
-        st.metric("Figure Types", unique_types)
+        st.metric("Figure Types", summary['unique_types'])
     with col3:
-        avg_conf = sum(c['confidence'] for c in classifications) / len(classifications)
-        st.metric("Avg Confidence", f"{avg_conf:.1%}")
+        st.metric("Avg Confidence", f"{summary['avg_conf']:.1%}")
 
     st.subheader("Figure Type Distribution")
-    type_counts = {}
-    for c in classifications:
-        t = c['classification']
-        type_counts[t] = type_counts.get(t, 0) + 1
-    df_types = pd.DataFrame(list(type_counts.items()), columns=['Type', 'Count'])
-    st.bar_chart(df_types.set_index('Type'))
+    st.bar_chart(summary['type_counts'].rename_axis('Type').to_frame('Count'))
 
     st.subheader("Download Options")
     col1, col2 = st.columns(2)
     with col1:
         if st.button("📦 Download All Figures as ZIP"):
-            zip_buffer = create_zip_download(figures, classifications)
-            st.download_button("Download ZIP", zip_buffer, "extracted_figures.zip", "application/zip")
+            # The figures don't change after processing, so build the archive only once
+            if st.session_state.zip_file is None:
+                st.session_state.zip_file = create_zip_download(figures, classifications)
+            zip_file = st.session_state.zip_file
+            zip_file.seek(0)
+            st.download_button("Download ZIP", zip_file.read(), "extracted_figures.zip", "application/zip")
     with col2:
         if st.button("📄 Generate Analysis Report"):
             generate_pdf_report(figures, classifications)
 
+    display_figure_grid(figures, classifications, df, summary['type_options'])
+
+@st.fragment
+def display_figure_grid(figures, classifications, df, type_options):
+    """Filter/sort controls and the card grid; as a fragment, changing them reruns only this block."""
     st.header("🖼️ Extracted Figures")
     col1, col2 = st.columns(2)
     with col1:
-        filter_type = st.selectbox("Filter by type:", ['All'] + sorted(type_counts.keys()))
+        filter_type = st.selectbox("Filter by type:", type_options)
     with col2:
         sort_by = st.selectbox("Sort by:", ['Page Number', 'Confidence', 'Figure Type'])
 
-    filtered = classifications
-    if filter_type != 'All':
-        filtered = [c for c in classifications if c['classification'] == filter_type]
-    if sort_by == 'Page Number':
-        filtered.sort(key=lambda x: x['page'])
-    elif sort_by == 'Confidence':
-        filtered.sort(key=lambda x: x['confidence'], reverse=True)
-    elif sort_by == 'Figure Type':
-        filtered.sort(key=lambda x: x['classification'])
+    # Filtered orders are memoized per (filter, sort), so paging and other reruns reuse them.
+    # Orders are new arrays; the session's classification list is never reordered.
+    view_key = (filter_type, sort_by)
+    order = st.session_state.view_orders.get(view_key)
+    if order is None:
+        order = st.session_state.sort_orders[sort_by]
+        if filter_type != 'All':
+            order = order[(df['classification'].to_numpy() == filter_type)[order]]
+        st.session_state.view_orders[view_key] = order
+
+    # Only one page of cards is rendered, so the browser never receives every image at once
+    total_pages = max(1, math.ceil(len(order) / FIGURES_PER_PAGE))
+    page = 1
+    if total_pages > 1:
+        page = st.number_input(f"Page (of {total_pages})", min_value=1, max_value=total_pages, value=1, step=1)
+    start = (page - 1) * FIGURES_PER_PAGE
+    filtered = [classifications[i] for i in order[start:start + FIGURES_PER_PAGE]]
+    if total_pages > 1:
+        st.caption(f"Showing figures {start + 1}-{start + len(filtered)} of {len(order)}")
 
     for i in range(0, len(filtered), 2):
         cols = st.columns(2)
@@ -246,10 +515,33 @@ def display_results():
                 with cols[j]:
                     display_figure_card(figure_data, result)
 
+@st.cache_data(show_spinner=False)
+def _summarize_classifications(df):
+    """Aggregate metrics for the summary panel; cached so widget reruns skip the work."""
+    type_counts = df['classification'].value_counts()
+    return {
+        'type_counts': type_counts,
+        'type_options': ['All'] + sorted(type_counts.index),
+        'unique_types': len(type_counts),
+        'avg_conf': df['confidence'].mean()
+    }
+
+def compute_sort_orders(df):
+    """Display order for each "Sort by" option, as arrays of row positions into df."""
+    return {
+        'Page Number': df.sort_values('page', kind='stable').index.to_numpy(),
+        'Confidence': df.sort_values('confidence', ascending=False, kind='stable').index.to_numpy(),
+        'Figure Type': df.sort_values('classification', kind='stable').index.to_numpy()
+    }
+
 def display_figure_card(figure_data, result):
+    # Figures normally arrive pre-encoded; encode any that don't once and keep the bytes for later reruns
+    if 'png_bytes' not in figure_data or 'thumb_bytes' not in figure_data:
+        prepare_figure_bytes([figure_data])
+
     emoji = get_figure_type_emoji(result['classification'])
     label = format_figure_type(result['classification'])
-    st.image(figure_data['image'], caption=f"Page {result['page']} - {emoji} {label}", use_container_width=True)
+    st.image(figure_data['thumb_bytes'], caption=f"Page {result['page']} - {emoji} {label}", use_container_width=True)
 
     conf = result['confidence']
     color = "🟢" if conf > 0.8 else "🟡" if conf > 0.6 else "🔴"
@@ -267,14 +559,20 @@ def display_figure_card(figure_data, result):
         with st.expander("AI Reasoning"):
             st.write(result['reasoning'])
 
-    buffer = io.BytesIO()
-    figure_data['image'].save(buffer, format='PNG')
-    buffer.seek(0)
-    st.download_button("Download Figure", buffer, f"figure_page_{result['page']}_{result['figure_id']}.png", "image/png", key=f"dl_{result['figure_id']}")
+    st.download_button("Download Figure", figure_data['png_bytes'], f"figure_page_{result['page']}_{result['figure_id']}.png", "image/png", key=f"dl_{result['figure_id']}")
 
 def create_zip_download(figures, classifications):
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+    # Figures are normally pre-encoded; encode any stragglers in parallel, since zipfile writes must stay serial
+    missing = [fig for fig in figures if not fig.get('png_bytes')]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as executor:
+            for fig, png_bytes in zip(missing, executor.map(lambda f: image_to_png_bytes(f['image']), missing)):
+                fig['png_bytes'] = png_bytes
+
+    # Small archives stay in memory; large ones spill to disk instead of pinning RSS
+    zip_buffer = tempfile.SpooledTemporaryFile(max_size=64 << 20, suffix='.zip')
+    # PNG data is already deflate-compressed, so images are stored as-is and only the CSV is compressed
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
         df = pd.DataFrame([{
             'Figure ID': i,
             'Filename': f"figure_page_{c['page']}_{i}.png",
@@ -282,15 +580,14 @@ def create_zip_download(figures, classifications):
             'Confidence': f"{c['confidence']:.1%}",
             'Page': c['page']
         } for i, c in enumerate(classifications)])
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        zip_file.writestr('figure_summary.csv', csv_buffer.getvalue())
+        # Write the CSV straight into its archive entry instead of building it in a StringIO first
+        csv_info = zipfile.ZipInfo('figure_summary.csv', date_time=time.localtime()[:6])
+        csv_info.compress_type = zipfile.ZIP_DEFLATED
+        with zip_file.open(csv_info, 'w') as csv_entry, io.TextIOWrapper(csv_entry, encoding='utf-8', newline='') as csv_file:
+            df.to_csv(csv_file, index=False)
 
         for i, (fig, c) in enumerate(zip(figures, classifications)):
-            img_buf = io.BytesIO()
-            fig['image'].save(img_buf, format='PNG')
-            img_buf.seek(0)
-            zip_file.writestr(f"figure_page_{c['page']}_{i}.png", img_buf.getvalue())
+            zip_file.writestr(f"figure_page_{c['page']}_{i}.png", fig['png_bytes'])
 
     zip_buffer.seek(0)
     return zip_buffer
@@ -313,22 +610,19 @@ def generate_pdf_report(figures, classifications):
         status.text("Creating report...")
 
         try:
-            pdf_buffer = report_generator.create_summary_buffer(figures, classifications, source_info)
+            pdf_bytes = report_generator.create_summary_buffer(figures, classifications, source_info).getvalue()
         except Exception as e:
             st.warning("Falling back to simple text summary.")
-            from io import BytesIO
-            pdf_buffer = BytesIO()
             text = f"FigSense Report\n{datetime.now()}\n{source_info}\n\n"
             for c in classifications:
                 text += f"- Page {c['page']}: {c['classification']} ({c['confidence']:.1%})\n"
-            pdf_buffer.write(text.encode('utf-8'))
-            pdf_buffer.seek(0)
+            pdf_bytes = text.encode('utf-8')
 
         progress.progress(100)
         status.text("Ready for download!")
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        st.download_button("📄 Download Report", pdf_buffer, f"figsense_report_{timestamp}.pdf", "application/pdf")
+        st.download_button("📄 Download Report", pdf_bytes, f"figsense_report_{timestamp}.pdf", "application/pdf")
 
     except Exception as e:
         st.error(f"Error generating report: {str(e)}")
@@ -0,0 +1,161 @@
+import io
+import os
+import hashlib
+import json
+import shutil
+import logging
+import time
+import threading
+from PIL import Image
+
+# Scratch directories older than this were left behind by a save that never finished
+STALE_TMP_SECONDS = 3600
+
+class ArtifactStore:
+    """On-disk store of per-PDF extraction and classification results."""
+
+    def __init__(self, root=None, max_entries=32):
+        """
+        Open (or create) the store.
+
+        Args:
+            root (str): Directory holding one subdirectory per processed PDF, defaults to ~/.figsense/artifacts
+            max_entries (int): Least recently used PDFs beyond this count are evicted
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if root is None:
+            root = os.path.join(os.path.expanduser('~'), '.figsense', 'artifacts')
+        self.root = root
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError as e:
+            # Same as the classification store: without a directory we just don't persist
+            self.logger.warning(f"Artifact store unavailable at {self.root}: {str(e)}")
+            self.root = None
+
+    def load(self, pdf_hash, min_area, namespace):
+        """
+        Load stored results for a PDF.
+
+        Args:
+            pdf_hash (str): SHA-256 of the PDF file
+            min_area (int): Minimum figure area the results were filtered with
+            namespace (str): Classifier model and prompt version the results came from
+
+        Returns:
+            tuple: (extracted_figures, classification_results, skipped), or None if not stored
+        """
+        entry_dir = self._entry_dir(pdf_hash, min_area, namespace)
+        if entry_dir is None or not os.path.isdir(entry_dir):
+            return None
+
+        try:
+            with open(os.path.join(entry_dir, 'figures.json'), encoding='utf-8') as f:
+                manifest = json.load(f)
+            with open(os.path.join(entry_dir, 'classifications.json'), encoding='utf-8') as f:
+                classification_results = json.load(f)
+
+            extracted_figures = []
+            for i, figure_meta in enumerate(manifest['figures']):
+                with open(os.path.join(entry_dir, 'figures', f"{i:04d}.png"), 'rb') as f:
+                    png_bytes = f.read()
+                with open(os.path.join(entry_dir, 'thumbs', f"{i:04d}.jpg"), 'rb') as f:
+                    thumb_bytes = f.read()
+
+                figure_data = dict(figure_meta)
+                # Image.open only reads the header; pixels are decoded if something needs them
+                figure_data['image'] = Image.open(io.BytesIO(png_bytes))
+                figure_data['image_bytes'] = png_bytes
+                figure_data['mime_type'] = 'image/png'
+                figure_data['png_bytes'] = png_bytes
+                figure_data['thumb_bytes'] = thumb_bytes
+                extracted_figures.append(figure_data)
+
+            # Directory mtime doubles as the last-used time for eviction
+            os.utime(entry_dir)
+            return extracted_figures, classification_results, manifest['skipped']
+
+        except (OSError, ValueError, KeyError) as e:
+            # A damaged or outdated entry would otherwise block every later save of this PDF
+            self.logger.warning(f"Discarding unreadable artifact store entry {entry_dir}: {str(e)}")
+            with self._lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+    def save(self, pdf_hash, min_area, namespace, extracted_figures, classification_results, skipped):
+        """Store results for a PDF, evicting the oldest PDFs past max_entries."""
+        entry_dir = self._entry_dir(pdf_hash, min_area, namespace)
+        if entry_dir is None:
+            return
+
+        # Write into a scratch directory and rename it into place, so readers never see a partial entry
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.join(tmp_dir, 'figures'))
+            os.makedirs(os.path.join(tmp_dir, 'thumbs'))
+
+            figures_meta = []
+            for i, figure_data in enumerate(extracted_figures):
+                with open(os.path.join(tmp_dir, 'figures', f"{i:04d}.png"), 'wb') as f:
+                    f.write(figure_data['png_bytes'])
+                with open(os.path.join(tmp_dir, 'thumbs', f"{i:04d}.jpg"), 'wb') as f:
+                    f.write(figure_data['thumb_bytes'])
+                figures_meta.append({
+                    'page': figure_data['page'],
+                    'index': figure_data['index'],
+                    'bbox': _bbox_to_list(figure_data['bbox']),
+                    'width': figure_data['width'],
+                    'height': figure_data['height'],
+                    'size': figure_data['size'],
+                    **({'type': figure_data['type']} if 'type' in figure_data else {})
+                })
+
+            with open(os.path.join(tmp_dir, 'figures.json'), 'w', encoding='utf-8') as f:
+                json.dump({'skipped': skipped, 'figures': figures_meta}, f)
+            with open(os.path.join(tmp_dir, 'classifications.json'), 'w', encoding='utf-8') as f:
+                json.dump([dict(result, bbox=_bbox_to_list(result['bbox'])) for result in classification_results], f)
+
+            with self._lock:
+                if os.path.isdir(entry_dir):
+                    # Another session stored the same PDF first; its copy is just as good
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                else:
+                    os.replace(tmp_dir, entry_dir)
+                self._evict()
+
+        except (OSError, TypeError, ValueError, KeyError) as e:
+            self.logger.warning(f"Error writing artifact store: {str(e)}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _entry_dir(self, pdf_hash, min_area, namespace):
+        if self.root is None:
+            return None
+        # The namespace holds characters that aren't safe in file names, so use a digest of it
+        namespace_digest = hashlib.blake2b(namespace.encode(), digest_size=8).hexdigest()
+        return os.path.join(self.root, f"{pdf_hash}-{min_area}-{namespace_digest}")
+
+    def _evict(self):
+        entries = []
+        stale_before = time.time() - STALE_TMP_SECONDS
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            if '.tmp-' in name:
+                # Recent scratch directories may belong to a save still in progress
+                if os.path.getmtime(path) < stale_before:
+                    shutil.rmtree(path, ignore_errors=True)
+            else:
+                entries.append((os.path.getmtime(path), path))
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+def _bbox_to_list(bbox):
+    """PyMuPDF rects aren't JSON serializable; store them as [x0, y0, x1, y1]."""
+    return None if bbox is None else [float(v) for v in bbox]
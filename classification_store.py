@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+# Access times are only refreshed when older than this, so hot reads don't write
+TOUCH_INTERVAL_SECONDS = 3600
+# Pending access-time refreshes are written together once this many pile up
+TOUCH_BATCH_SIZE = 100
+
+class ClassificationStore:
+    """Persistent SQLite store of figure classification results."""
+
+    def __init__(self, db_path=None, max_entries=50000):
+        """
+        Open (or create) the store.
+
+        Args:
+            db_path (str): Path to the SQLite database, defaults to ~/.figsense/classifications.db
+            max_entries (int): Least recently used entries beyond this count are evicted
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        # Evicting in batches keeps the sort off the common insert path
+        self.evict_margin = max(1, max_entries // 10)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._row_count = 0
+        self._pending_touches = {}
+
+        if db_path is None:
+            db_path = os.path.join(os.path.expanduser('~'), '.figsense', 'classifications.db')
+
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS classifications_accessed_at ON classifications (accessed_at)"
+            )
+            self._conn.commit()
+            self._row_count = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        except (OSError, sqlite3.Error) as e:
+            # The app still works without persistence, it just pays for every figure again
+            self.logger.warning(f"Classification store unavailable at {db_path}: {str(e)}")
+            self._conn = None
+
+    def get(self, key):
+        """Return the stored result dict for key, or None."""
+        if self._conn is None:
+            return None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT result, accessed_at FROM classifications WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[1] > TOUCH_INTERVAL_SECONDS:
+                    self._pending_touches[key] = now
+                    if len(self._pending_touches) >= TOUCH_BATCH_SIZE:
+                        self._flush_touches()
+                        self._conn.commit()
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self.logger.warning(f"Error reading classification store: {str(e)}")
+            return None
+
+    def put(self, key, result):
+        """Store a result dict under key, evicting the oldest entries past max_entries."""
+        if self._conn is None:
+            return
+
+        try:
+            with self._lock:
+                self._flush_touches()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO classifications (key, result, accessed_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), time.time())
+                )
+                # Replacing an existing key overcounts, which only makes the next eviction check run early
+                self._row_count += 1
+                if self._row_count > self.max_entries + self.evict_margin:
+                    self._evict()
+                self._conn.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.logger.warning(f"Error writing classification store: {str(e)}")
+
+    def _flush_touches(self):
+        """Write buffered access times; the caller holds the lock and commits."""
+        if self._pending_touches:
+            self._conn.executemany(
+                "UPDATE classifications SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._pending_touches.items()]
+            )
+            self._pending_touches.clear()
+
+    def _evict(self):
+        """Delete the least recently used rows past max_entries; the caller holds the lock and commits."""
+        self._row_count = self._conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        excess = self._row_count - self.max_entries
+        if excess > 0:
+            # Walks the accessed_at index from the oldest end instead of sorting the whole table
+            self._conn.execute(
+                "DELETE FROM classifications WHERE key IN ("
+                "SELECT key FROM classifications ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            self._row_count = self.max_entries
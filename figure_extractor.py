@@ -19,12 +19,26 @@ class PDFFigureExtractor:
         Returns:
             list: List of dictionaries containing figure data
         """
-        figures = []
+        return list(self.iter_figures(pdf_path))
+    
+    def iter_figures(self, pdf_path):
+        """
+        Yield figures from a PDF file one at a time, as each page is processed.
         
+        Args:
+            pdf_path (str): Path to the PDF file
+            
+        Yields:
+            dict: Figure data, in the same order extract_figures returns them
+        """
         try:
             # Open PDF document
             doc = fitz.open(pdf_path)
-            
+        except Exception as e:
+            self.logger.error(f"Error processing PDF: {str(e)}")
+            raise
+        
+        try:
             for page_num in range(len(doc)):
                 page = doc.load_page(page_num)
                 
@@ -52,12 +66,24 @@ class PDFFigureExtractor:
                             img_pil = Image.open(io.BytesIO(img_data))
                             pix_rgb = None
                         
+                        # Keep the image as stored in the PDF when it is a plain JPEG (typically a photo);
+                        # it is far smaller to upload than the PNG re-encode above
+                        source_bytes, source_mime_type = None, None
+                        embedded = doc.extract_image(xref)
+                        if (embedded and embedded.get('ext') in ('jpeg', 'jpg')
+                                and embedded.get('colorspace') in (1, 3) and not embedded.get('smask')):
+                            source_bytes, source_mime_type = embedded['image'], 'image/jpeg'
+                        
                         # Get image position and size
                         img_rect = page.get_image_rects(img)[0] if page.get_image_rects(img) else None
                         
                         # Store figure data
                         figure_data = {
                             'image': img_pil,
+                            'image_bytes': img_data,
+                            'mime_type': 'image/png',
+                            'source_bytes': source_bytes,
+                            'source_mime_type': source_mime_type,
                             'page': page_num + 1,
                             'index': img_index,
                             'bbox': img_rect,
@@ -66,26 +92,25 @@ class PDFFigureExtractor:
                             'size': len(img_data)
                         }
                         
-                        figures.append(figure_data)
-                        
                         # Clean up
                         pix = None
                         
                     except Exception as e:
                         self.logger.warning(f"Error extracting image {img_index} from page {page_num + 1}: {str(e)}")
                         continue
+                    
+                    yield figure_data
                 
                 # Also extract vector graphics as images
                 vector_figures = self._extract_vector_graphics(page, page_num + 1)
-                figures.extend(vector_figures)
-            
-            doc.close()
+                yield from vector_figures
             
         except Exception as e:
             self.logger.error(f"Error processing PDF: {str(e)}")
             raise
         
-        return figures
+        finally:
+            doc.close()
     
     def _extract_vector_graphics(self, page, page_num):
         """
@@ -136,6 +161,8 @@ class PDFFigureExtractor:
                     # Store vector figure data
                     figure_data = {
                         'image': img_pil,
+                        'image_bytes': img_data,
+                        'mime_type': 'image/png',
                         'page': page_num,
                         'index': f"vector_{group_idx}",
                         'bbox': clip_rect,
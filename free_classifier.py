@@ -75,7 +75,6 @@ class FreeFigureClassifier:
             # Convert PIL image to bytes
             img_buffer = io.BytesIO()
             image.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
             
             # Try Hugging Face API first (free but may have rate limits)
             try:
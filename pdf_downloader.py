@@ -6,6 +6,8 @@ from urllib.parse import urlparse
 from urllib.request import urlopen
 import streamlit as st
 
+MAX_PDF_BYTES = 100 * 1024 * 1024  # 100MB limit
+
 class PDFDownloader:
     """Download PDF files from URLs."""
     
@@ -44,33 +46,39 @@ class PDFDownloader:
             
             # Check if content type is PDF
             content_type = response.headers.get('content-type', '').lower()
-            if 'pdf' not in content_type and not url.lower().endswith('.pdf'):
-                # Try to detect PDF by content
-                first_bytes = response.content[:8]
-                if not first_bytes.startswith(b'%PDF'):
-                    raise ValueError("URL does not point to a PDF file")
+            sniff_content = 'pdf' not in content_type and not url.lower().endswith('.pdf')
             
             progress_bar.progress(50)
             status_text.text("Processing downloaded file...")
             
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    tmp_file.write(chunk)
+            # Stream straight to a temporary file; response.content would buffer the whole body
+            file_size = 0
+            with response, tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
                 tmp_file_path = tmp_file.name
+                try:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        if sniff_content:
+                            # Try to detect PDF by content
+                            if not chunk.startswith(b'%PDF'):
+                                raise ValueError("URL does not point to a PDF file")
+                            sniff_content = False
+                        
+                        file_size += len(chunk)
+                        if file_size > MAX_PDF_BYTES:
+                            raise ValueError("File is too large (max 100MB)")
+                        tmp_file.write(chunk)
+                except Exception:
+                    tmp_file.close()
+                    os.unlink(tmp_file_path)
+                    raise
             
             progress_bar.progress(75)
             
             # Validate file size
-            file_size = os.path.getsize(tmp_file_path)
             if file_size == 0:
                 os.unlink(tmp_file_path)
                 raise ValueError("Downloaded file is empty")
             
-            if file_size > 100 * 1024 * 1024:  # 100MB limit
-                os.unlink(tmp_file_path)
-                raise ValueError("File is too large (max 100MB)")
-            
             progress_bar.progress(100)
             status_text.text("Download complete!")
             
@@ -1,6 +1,7 @@
 import os
 import io
 import tempfile
+from collections import Counter
 from datetime import datetime
 from PIL import Image
 from reportlab.lib.pagesizes import A4, letter
@@ -231,14 +232,9 @@ class PDFReportGenerator:
         
         story.append(Paragraph("Figure Type Distribution", self.section_style))
         
-        # Calculate type counts
-        type_counts = {}
-        for classification in classifications:
-            fig_type = classification['classification']
-            type_counts[fig_type] = type_counts.get(fig_type, 0) + 1
-        
-        # Sort by count (descending)
-        sorted_types = sorted(type_counts.items(), key=lambda x: x[1], reverse=True)
+        # Calculate type counts, sorted by count (descending)
+        type_counts = Counter(c['classification'] for c in classifications)
+        sorted_types = type_counts.most_common()
         
         # Create distribution table
         distribution_data = [['Figure Type', 'Count', 'Percentage', 'Examples']]
@@ -300,8 +296,12 @@ class PDFReportGenerator:
             
             # Create thumbnail with better error handling
             try:
-                # Create a smaller version of the image for the report
-                img = figure_data['image'].copy()
+                # Create a smaller version of the image for the report, starting from the
+                # card thumbnail when there is one so the full-resolution image isn't copied
+                if figure_data.get('thumb_bytes'):
+                    img = Image.open(io.BytesIO(figure_data['thumb_bytes']))
+                else:
+                    img = figure_data['image'].copy()
                 
                 # Ensure image is in RGB mode
                 if img.mode != 'RGB':
@@ -1,12 +1,17 @@
 import os
 import zipfile
 import io
+import hashlib
+from collections import Counter
+from statistics import fmean
 from PIL import Image
 import streamlit as st
 
 def get_file_size(uploaded_file):
     """Get human-readable file size."""
-    size = len(uploaded_file.getvalue())
+    # getbuffer() is a zero-copy view; getvalue() would copy the whole file just to measure it
+    with uploaded_file.getbuffer() as view:
+        size = view.nbytes
     
     for unit in ['B', 'KB', 'MB', 'GB']:
         if size < 1024.0:
@@ -14,6 +19,14 @@ def get_file_size(uploaded_file):
         size /= 1024.0
     return f"{size:.1f} TB"
 
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file, read in chunks so large PDFs aren't loaded whole."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def create_download_link(data, filename, text="Download"):
     """Create a download link for data."""
     return f'<a href="data:application/octet-stream;base64,{data}" download="{filename}">{text}</a>'
@@ -59,6 +72,54 @@ def create_thumbnail(image, size=(150, 150)):
     thumbnail.thumbnail(size, Image.Resampling.LANCZOS)
     return thumbnail
 
+def image_to_png_bytes(image, compress_level=1):
+    """Encode an image as PNG bytes, favouring encode speed over file size."""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=False, compress_level=compress_level)
+    return buffer.getvalue()
+
+def image_to_jpeg_bytes(image, quality=85):
+    """Encode an image as JPEG bytes, flattening any transparency onto white."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # JPEG has no alpha channel; flatten onto white so transparent areas don't turn black
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=False)
+    return buffer.getvalue()
+
+def fast_thumbnail(image, max_edge):
+    """
+    Downscale an image so its longest edge is at most max_edge.
+
+    Unlike create_thumbnail this resizes straight from the source instead of
+    copying the full-size image first. Large images are first box-reduced by
+    an integer factor with Image.reduce, which is much cheaper than filtering
+    every source pixel, and LANCZOS only handles the final, small step.
+    Images that already fit are returned unchanged.
+    """
+    scale = max_edge / max(image.width, image.height)
+    if scale >= 1.0:
+        return image
+
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    # Palette and bilevel images would only get NEAREST resampling (and reduce() rejects them),
+    # so filter them in a continuous-tone mode instead
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    elif image.mode == '1':
+        image = image.convert('L')
+
+    factor = min(image.width // size[0], image.height // size[1])
+    if factor > 1:
+        image = image.reduce(factor)
+    return image.resize(size, Image.Resampling.LANCZOS)
+
 def safe_filename(filename):
     """Create a safe filename by removing/replacing invalid characters."""
     invalid_chars = '<>:"/\\|?*'
@@ -142,20 +203,18 @@ def calculate_processing_stats(figures, classifications):
     if not figures or not classifications:
         return {}
     
+    type_counts = Counter(c['classification'] for c in classifications)
+    total_pages = len({c['page'] for c in classifications})
+    
     stats = {
         'total_figures': len(figures),
-        'unique_types': len(set(c['classification'] for c in classifications)),
-        'avg_confidence': sum(c['confidence'] for c in classifications) / len(classifications),
-        'total_pages': len(set(c['page'] for c in classifications)),
-        'figures_per_page': len(figures) / len(set(c['page'] for c in classifications)),
-        'type_distribution': {}
+        'unique_types': len(type_counts),
+        'avg_confidence': fmean(c['confidence'] for c in classifications),
+        'total_pages': total_pages,
+        'figures_per_page': len(figures) / total_pages,
+        'type_distribution': dict(type_counts)
     }
     
-    # Calculate type distribution
-    for classification in classifications:
-        fig_type = classification['classification']
-        stats['type_distribution'][fig_type] = stats['type_distribution'].get(fig_type, 0) + 1
-    
     return stats
 
 def log_processing_info(pdf_filename, stats):